@@ -0,0 +1,147 @@
+"""
+Shared Bright Data Web Unlocker plumbing used by the scrapers: proxy
+configuration, pooled HTTP clients, retry backoff and client-side rate limiting.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import urllib3
+
+# Suppress SSL warnings for Bright Data proxy
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Load environment variables
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+# Configuration - Bright Data Web Unlocker
+BRIGHTDATA_HOST = os.environ.get("BRIGHTDATA_HOST", "brd.superproxy.io")
+BRIGHTDATA_PORT = int(os.environ.get("BRIGHTDATA_PORT", "33335"))
+BRIGHTDATA_USERNAME = os.environ.get("BRIGHTDATA_USERNAME")
+BRIGHTDATA_PASSWORD = os.environ.get("BRIGHTDATA_PASSWORD")
+
+# Proxy settings are built once at import (None/empty without credentials;
+# callers reject requests before they are sent in that case)
+if BRIGHTDATA_USERNAME and BRIGHTDATA_PASSWORD:
+    # Encode password in case it contains special characters
+    PROXY_URL = f"http://{BRIGHTDATA_USERNAME}:{quote(BRIGHTDATA_PASSWORD, safe='')}@{BRIGHTDATA_HOST}:{BRIGHTDATA_PORT}"
+    PROXIES = {"http": PROXY_URL, "https": PROXY_URL}
+else:
+    PROXY_URL = None
+    PROXIES = {}
+
+REQUEST_TIMEOUT = 60
+POOL_SIZE = 16  # Connections kept alive to the Bright Data proxy per session
+MAX_RETRIES = 3  # Retries for rate limiting (429), server errors and timeouts
+RETRY_AFTER_CAP = 60  # Longest server-requested Retry-After we honor (seconds)
+BACKOFF_BASE = 1.0  # First/minimum backoff between retries (seconds)
+BACKOFF_CAP = 30  # Upper bound for our own backoff (seconds)
+ASYNC_MAX_CONNECTIONS = 64  # Default connection cap for async (HTTP/2) clients; all traffic goes to one proxy host
+# Client-side request rate to Bright Data (requests/second, 0 disables); bursts up to 2x
+BRIGHTDATA_RATE_LIMIT = float(os.environ.get("BRIGHTDATA_RATE_LIMIT", "10"))
+
+
+# One keep-alive session per thread: requests.Session is not guaranteed
+# thread-safe, but each thread keeps its connection to the proxy alive.
+# Web Unlocker picks the exit IP per request, so reusing the proxy connection
+# does not pin us to a single IP.
+_session_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Return this thread's pooled keep-alive session, creating it on first use."""
+    session = getattr(_session_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.proxies = PROXIES
+        session.verify = False  # Bright Data may require this for SSL
+        session.headers["Connection"] = "keep-alive"
+        _session_local.session = session
+    return session
+
+
+def new_async_client(max_connections: int = ASYNC_MAX_CONNECTIONS) -> httpx.AsyncClient:
+    """Create an HTTP/2 client that multiplexes requests over pooled proxy connections."""
+    return httpx.AsyncClient(
+        proxy=PROXY_URL,
+        http2=True,
+        verify=False,  # Bright Data may require this for SSL
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+def retry_delay(prev_delay: float, response: requests.Response | httpx.Response | None = None) -> float:
+    """
+    Seconds to wait before the next retry, given the previous wait (start with
+    BACKOFF_BASE). Prefers the server's Retry-After header (delta-seconds or
+    HTTP-date), else capped decorrelated jitter so concurrent callers don't
+    retry in lockstep.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                if retry_at.tzinfo is None:
+                    retry_at = retry_at.replace(tzinfo=timezone.utc)
+                delay = max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None and 0 <= delay <= RETRY_AFTER_CAP:
+            return delay
+    return min(BACKOFF_CAP, random.uniform(BACKOFF_BASE, max(prev_delay, BACKOFF_BASE) * 3))
+
+
+class RateLimiter:
+    """
+    Token bucket shared by sync and async callers: allows `rate` requests per
+    second on average and bursts of up to `burst`. Each caller reserves the
+    next free slot, then sleeps until it arrives.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.burst = burst or max(1, int(rate * 2))
+        self._next_free = 0.0  # Monotonic time at which the bucket is full again
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long to wait before using it."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            next_free = max(self._next_free, now)
+            self._next_free = next_free + self.interval
+            # The bucket holds `burst` tokens: only wait once we're that far ahead
+            return max(0.0, next_free - now - (self.burst - 1) * self.interval)
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self) -> None:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# Process-wide limiter for Bright Data requests
+rate_limiter = RateLimiter(BRIGHTDATA_RATE_LIMIT)
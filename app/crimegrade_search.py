@@ -1,34 +1,36 @@
-import json
+import asyncio
 import logging
 import os
-import random
+import queue
 import time
+import httpx
+import orjson
 import requests
-from bs4 import BeautifulSoup
+import zstandard as zstd
+from lxml import etree
+from lxml import html as lxml_html
 from typing import Dict, Optional, List
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
-from urllib.parse import quote
-from pathlib import Path
-from dotenv import load_dotenv
-import urllib3
 
-# Suppress SSL warnings for Bright Data proxy
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# Load environment variables from .env file
-load_dotenv(Path(__file__).parent.parent / ".env")
+from brightdata import (
+    BACKOFF_BASE,
+    BRIGHTDATA_PASSWORD,
+    BRIGHTDATA_USERNAME,
+    MAX_RETRIES,
+    REQUEST_TIMEOUT,
+    get_session,
+    new_async_client,
+    retry_delay,
+)
 
 # --- Constants ---
-# Bright Data Web Unlocker configuration
-BRIGHTDATA_HOST = os.getenv('BRIGHTDATA_HOST', 'brd.superproxy.io')
-BRIGHTDATA_PORT = int(os.getenv('BRIGHTDATA_PORT', '33335'))
-BRIGHTDATA_USERNAME = os.getenv('BRIGHTDATA_USERNAME')
-BRIGHTDATA_PASSWORD = os.getenv('BRIGHTDATA_PASSWORD')
-
-REQUEST_TIMEOUT = 60 # Request timeout in seconds
-MAX_RETRIES = 3 # Max retries for rate limiting or other transient errors
+# Bright Data proxy settings, timeouts and retry policy live in brightdata.py
+CRIME_MAX_IN_FLIGHT = 50 # Connection cap for this scraper's async (HTTP/2) client (brightdata.ASYNC_MAX_CONNECTIONS is the shared default)
+COMPACT_EVERY_BATCHES = 20 # Fold the results journal into the JSON snapshot every N saved batches
+FLUSH_INTERVAL = 1.0 # Max seconds the writer thread holds results/failures before flushing them
+INFLIGHT_PER_WORKER = 2 # Tasks kept scheduled per worker; the rest of the input stays a plain list
+SNAPSHOT_ZSTD_LEVEL = 3 # zstd level for the results snapshot (fast, still several times smaller than JSON)
 
 # --- Logging Setup ---
 # Configure logging more centrally
@@ -37,106 +39,146 @@ logger = logging.getLogger(__name__)
 
 
 # --- Helper Function for Bright Data Requests ---
-def _make_brightdata_request(target_url: str, retry_count=0) -> Optional[requests.Response]:
+def _make_brightdata_request(target_url: str) -> Optional[requests.Response]:
     """Makes a request to the target URL via Bright Data Web Unlocker with retries."""
     if not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
         logger.error("Bright Data credentials not configured")
         return None
 
-    # Encode password in case it contains special characters
-    encoded_password = quote(BRIGHTDATA_PASSWORD, safe='')
-    proxy_url = f"http://{BRIGHTDATA_USERNAME}:{encoded_password}@{BRIGHTDATA_HOST}:{BRIGHTDATA_PORT}"
-    proxies = {"http": proxy_url, "https": proxy_url}
+    session = get_session()
+    wait_time = BACKOFF_BASE
+    for attempt in range(MAX_RETRIES + 1):
+        logger.info(f"Attempt {attempt + 1}/{MAX_RETRIES}: Requesting {target_url} via Bright Data")
 
-    logger.info(f"Attempt {retry_count + 1}/{MAX_RETRIES}: Requesting {target_url} via Bright Data")
-
-    try:
-        response = requests.get(
-            target_url,
-            proxies=proxies,
-            verify=False,
-            timeout=REQUEST_TIMEOUT
-        )
+        try:
+            response = session.get(target_url, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.Timeout:
+            logger.warning(f"Request timed out for {target_url}. Attempt {attempt + 1}/{MAX_RETRIES}.")
+            if attempt < MAX_RETRIES:
+                time.sleep(1)
+                continue
+            logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to timeout.")
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request failed for {target_url}. Status: N/A. Error: {e}")
+            return None
 
         # Check response status code
-        if response.status_code == 429:
-            # Rate limited
-            logger.warning(f"Rate limited (429) for {target_url}. Attempt {retry_count + 1}/{MAX_RETRIES}.")
-            if retry_count < MAX_RETRIES:
-                wait_time = (2 ** retry_count) + random.uniform(0.5, 1.5) # Exponential backoff
+        if response.status_code == 403:
+            logger.error(f"Received 403 Forbidden for {target_url}. Check Bright Data credentials or zone settings.")
+            return None
+        if response.status_code == 429 or response.status_code >= 500:
+            # Rate limited or server error
+            reason = "rate limit (429)" if response.status_code == 429 else f"server error ({response.status_code})"
+            logger.warning(f"Got {reason} for {target_url}. Attempt {attempt + 1}/{MAX_RETRIES}.")
+            if attempt < MAX_RETRIES:
+                wait_time = retry_delay(wait_time, response) # Retry-After or decorrelated jitter
                 logger.warning(f"Retrying {target_url} in {wait_time:.2f} seconds...")
                 time.sleep(wait_time)
-                return _make_brightdata_request(target_url, retry_count + 1)
-            else:
-                logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to rate limit (429).")
-                return None
-        elif response.status_code == 403:
-             logger.error(f"Received 403 Forbidden for {target_url}. Check Bright Data credentials or zone settings.")
-             return None
-        elif response.status_code >= 500:
-            # Server error
-             logger.warning(f"Server error ({response.status_code}) for {target_url}. Attempt {retry_count + 1}/{MAX_RETRIES}.")
-             if retry_count < MAX_RETRIES:
-                 wait_time = (2 ** retry_count) + random.uniform(0.5, 1.5)
-                 logger.warning(f"Retrying {target_url} in {wait_time:.2f} seconds...")
-                 time.sleep(wait_time)
-                 return _make_brightdata_request(target_url, retry_count + 1)
-             else:
-                 logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to server error ({response.status_code}).")
-                 return None
-
-        response.raise_for_status()
+                continue
+            logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to {reason}.")
+            return None
+
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"Request failed for {target_url}. Status: {response.status_code}. Error: {e}")
+            return None
 
         logger.info(f"Successfully received response via Bright Data for {target_url} (status: {response.status_code})")
         return response
 
-    except requests.exceptions.Timeout:
-        logger.warning(f"Request timed out for {target_url}. Attempt {retry_count + 1}/{MAX_RETRIES}.")
-        if retry_count < MAX_RETRIES:
-            time.sleep(1)
-            return _make_brightdata_request(target_url, retry_count + 1)
-        else:
-             logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to timeout.")
-             return None
-    except requests.exceptions.RequestException as e:
-        status_code = e.response.status_code if e.response is not None else 'N/A'
-        logger.error(f"Request failed for {target_url}. Status: {status_code}. Error: {e}")
+    return None
+
+
+# --- Async Requests for Bulk Scraping ---
+async def _make_brightdata_request_async(target_url: str, client: httpx.AsyncClient) -> Optional[httpx.Response]:
+    """Async counterpart of _make_brightdata_request, sharing one client across requests."""
+    if not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
+        logger.error("Bright Data credentials not configured")
         return None
 
+    wait_time = BACKOFF_BASE
+    for attempt in range(MAX_RETRIES + 1):
+        logger.info(f"Attempt {attempt + 1}/{MAX_RETRIES}: Requesting {target_url} via Bright Data")
+        try:
+            response = await client.get(target_url)
+        except httpx.TimeoutException:
+            logger.warning(f"Request timed out for {target_url}. Attempt {attempt + 1}/{MAX_RETRIES}.")
+            if attempt < MAX_RETRIES:
+                await asyncio.sleep(1)
+                continue
+            logger.error(f"Failed {target_url} after {MAX_RETRIES} retries due to timeout.")
+            return None
+        except httpx.HTTPError as e:
+            logger.error(f"Request failed for {target_url}. Error: {e}")
+            return None
 
-# --- Main Scraping Function ---
-def search_crime_grade(zipcode: str) -> Optional[Dict[str, str]]:
-    """Fetches and parses crime grade data for a zipcode using Bright Data."""
-    target_url = f'https://crimegrade.org/safest-places-in-{zipcode}/'
-    logger.info(f"Processing zipcode: {zipcode}")
+        if response.status_code == 403:
+            logger.error(f"Received 403 Forbidden for {target_url}. Check Bright Data credentials or zone settings.")
+            return None
+        if response.status_code == 429 or response.status_code >= 500:
+            logger.warning(f"Got {response.status_code} for {target_url}. Attempt {attempt + 1}/{MAX_RETRIES}.")
+            if attempt < MAX_RETRIES:
+                wait_time = retry_delay(wait_time, response)
+                logger.warning(f"Retrying {target_url} in {wait_time:.2f} seconds...")
+                await asyncio.sleep(wait_time)
+                continue
+            logger.error(f"Failed {target_url} after {MAX_RETRIES} retries (status {response.status_code}).")
+            return None
+        if response.is_error:
+            logger.error(f"Request failed for {target_url}. Status: {response.status_code}")
+            return None
 
-    response = _make_brightdata_request(target_url) # Use the helper
+        logger.info(f"Successfully received response via Bright Data for {target_url} (status: {response.status_code})")
+        return response
 
-    if response is None or response.status_code != 200:
-         # If helper returned None or reported an issue that wasn't retried
-         logger.error(f"Failed to get successful response for zipcode {zipcode} via Bright Data.")
-         return None
+    return None
+
+
+# --- Parsing ---
+def _cls(name: str) -> str:
+    """XPath predicate matching elements whose class list contains `name` (like CSS `.name`)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Selectors are compiled once at import instead of on every page and row
+_X_CRIME_SECTION = etree.XPath(f"//div[{_cls('one_half')}][not(preceding-sibling::*)]") # div.one_half:nth-child(1)
+_X_OVERALL_GRADE = etree.XPath(f".//p[{_cls('overallGradeLetter')}]") # p.overallGradeLetter
+_X_GRADE_ROWS = etree.XPath(f".//table[{_cls('gradeComponents')}]//tr") # table.gradeComponents tr
+_X_CRIME_TYPE = etree.XPath(f"./*[1][self::td]//div[{_cls('mtr-cell-content')}]") # td:nth-child(1) div.mtr-cell-content
+_X_GRADE = etree.XPath(f"./*[2][self::td]//div[{_cls('mtr-cell-content')}]//span") # td:nth-child(2) div.mtr-cell-content span
+
+# Class names that only appear on a real grade page; CAPTCHA/block pages have neither
+_GRADE_PAGE_MARKERS = (b'overallGradeLetter', b'gradeComponents')
+
+
+def _parse_crime_grade(content: bytes, zipcode: str, target_url: str) -> Optional[Dict[str, str]]:
+    """Parses a crimegrade.org page into a dict of grades (None if nothing usable was found)."""
+    # Cheap substring check so block pages are skipped without building a DOM
+    if not any(marker in content for marker in _GRADE_PAGE_MARKERS):
+        logger.warning(f"Response for zipcode {zipcode} is not a grade page (CAPTCHA/block?). URL: {target_url}")
+        logger.debug(f"Response snippet for {zipcode}: {content[:500]!r}")
+        return None
 
-    # If we get here, Bright Data returned a 200, indicating it successfully fetched *something*
-    # Now we parse the content it returned.
     try:
-        # Parse the HTML from the response content
-        soup = BeautifulSoup(response.content, 'html.parser') # Use response.content for bytes
+        # Parse the HTML with lxml's C parser
+        tree = lxml_html.fromstring(content)
 
         # Find the crime grade container
-        # Using the same selectors as before
-        crime_section = soup.select_one('div.one_half:nth-child(1)')
+        crime_sections = _X_CRIME_SECTION(tree)
+        crime_section = crime_sections[0] if crime_sections else None
 
-        if not crime_section:
-            # It's possible ScraperAPI got a CAPTCHA page or different layout
+        if crime_section is None:
+            # It's possible the proxy got a CAPTCHA page or different layout
             logger.warning(f"Could not find crime section in response for zipcode {zipcode}. URL: {target_url}")
             # Log a snippet of the response for debugging
-            logger.debug(f"Response snippet for {zipcode}: {response.text[:500]}")
+            logger.debug(f"Response snippet for {zipcode}: {content[:500]!r}")
             return None
 
         # Extract overall grade
-        overall_grade_element = crime_section.select_one('p.overallGradeLetter')
-        overall_grade = overall_grade_element.text.strip() if overall_grade_element else "N/A"
+        overall_grade_elements = _X_OVERALL_GRADE(crime_section)
+        overall_grade = overall_grade_elements[0].text_content().strip() if overall_grade_elements else "N/A"
         if overall_grade == "N/A":
              logger.warning(f"Could not find overall grade element for zipcode {zipcode}")
 
@@ -146,16 +188,16 @@ def search_crime_grade(zipcode: str) -> Optional[Dict[str, str]]:
         results = {"overall": overall_grade}
 
         # Extract specific crime grades from the table
-        grade_rows = crime_section.select('table.gradeComponents tr')
+        grade_rows = _X_GRADE_ROWS(crime_section)
 
         for row in grade_rows:
             # Extract crime type and grade
-            crime_type_element = row.select_one('td:nth-child(1) div.mtr-cell-content')
-            grade_element = row.select_one('td:nth-child(2) div.mtr-cell-content span')
+            crime_type_elements = _X_CRIME_TYPE(row)
+            grade_elements = _X_GRADE(row)
 
-            if crime_type_element and grade_element:
-                crime_type = crime_type_element.text.strip().replace(' Grade', '').lower()
-                grade = grade_element.text.strip()
+            if crime_type_elements and grade_elements:
+                crime_type = crime_type_elements[0].text_content().strip().replace(' Grade', '').lower()
+                grade = grade_elements[0].text_content().strip()
                 results[crime_type] = grade
                 # logger.info(f"Found {crime_type} grade: {grade}") # Reduce log verbosity
             else:
@@ -172,44 +214,208 @@ def search_crime_grade(zipcode: str) -> Optional[Dict[str, str]]:
     except Exception as e:
         # Catch errors during parsing
         logger.error(f"Error parsing crime data for {zipcode}: {e}")
-        logger.debug(f"Response content causing parsing error for {zipcode}: {response.text[:500]}")
+        logger.debug(f"Response content causing parsing error for {zipcode}: {content[:500]!r}")
         return None
 
 
-# --- Processing Function (Modified for Concurrency) ---
+# --- Main Scraping Functions ---
+def search_crime_grade(zipcode: str) -> Optional[Dict[str, str]]:
+    """Fetches and parses crime grade data for a zipcode using Bright Data."""
+    target_url = f'https://crimegrade.org/safest-places-in-{zipcode}/'
+    logger.info(f"Processing zipcode: {zipcode}")
+
+    response = _make_brightdata_request(target_url) # Use the helper
+
+    if response is None or response.status_code != 200:
+         # If helper returned None or reported an issue that wasn't retried
+         logger.error(f"Failed to get successful response for zipcode {zipcode} via Bright Data.")
+         return None
+
+    # If we get here, Bright Data returned a 200, indicating it successfully fetched *something*
+    # Now we parse the content it returned.
+    return _parse_crime_grade(response.content, zipcode, target_url)
+
+
+async def search_crime_grade_async(zipcode: str, client: httpx.AsyncClient) -> Optional[Dict[str, str]]:
+    """Async variant of search_crime_grade; all calls share one HTTP/2 client."""
+    target_url = f'https://crimegrade.org/safest-places-in-{zipcode}/'
+    logger.info(f"Processing zipcode: {zipcode}")
+
+    response = await _make_brightdata_request_async(target_url, client)
+
+    if response is None or response.status_code != 200:
+         logger.error(f"Failed to get successful response for zipcode {zipcode} via Bright Data.")
+         return None
+
+    return _parse_crime_grade(response.content, zipcode, target_url)
+
+
+# --- Persistence ---
+# Results are appended to a JSONL journal as they arrive (O(1) per result) and
+# periodically folded into the zstd-compressed JSON snapshot that main.py reads.
+# The snapshot is written to a temp file and renamed into place, so a crash never
+# truncates it.
+def _load_results(snapshot_file: str, journal_file: str) -> Dict[str, Optional[Dict[str, str]]]:
+    """Load the JSON snapshot, then replay the journal on top of it (last entry wins)."""
+    results = {}
+    # Fall back to the uncompressed snapshot written by older versions
+    legacy_file = snapshot_file.removesuffix('.zst')
+    if not os.path.exists(snapshot_file) and os.path.exists(legacy_file):
+        snapshot_file = legacy_file
+    if os.path.exists(snapshot_file):
+        try:
+            with open(snapshot_file, 'rb') as file:
+                raw = file.read()
+            if snapshot_file.endswith('.zst'):
+                raw = zstd.ZstdDecompressor().decompress(raw)
+            results = orjson.loads(raw)
+            logger.info(f"Loaded {len(results)} existing crime grade results from {snapshot_file}")
+        except (orjson.JSONDecodeError, zstd.ZstdError, IOError) as e:
+             logger.error(f"Error loading existing results from {snapshot_file}: {e}. Starting fresh.")
+             results = {}
+    else:
+        logger.info(f"No existing results file found at {snapshot_file}, starting fresh.")
+
+    if os.path.exists(journal_file):
+        replayed = 0
+        try:
+            with open(journal_file, 'rb') as file:
+                for line in file:
+                    try:
+                        results.update(orjson.loads(line))
+                        replayed += 1
+                    except orjson.JSONDecodeError:
+                        # A torn last line from an interrupted run
+                        logger.warning(f"Skipping malformed line in {journal_file}")
+            logger.info(f"Replayed {replayed} journal entries from {journal_file}")
+        except IOError as e:
+            logger.error(f"Error reading results journal {journal_file}: {e}")
+
+    return results
+
+
+def _write_snapshot(snapshot_file: str, results: Dict[str, Optional[Dict[str, str]]]) -> None:
+    """Atomically replace the compressed JSON snapshot with the given results."""
+    tmp_file = f"{snapshot_file}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(zstd.ZstdCompressor(level=SNAPSHOT_ZSTD_LEVEL).compress(orjson.dumps(results)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, snapshot_file)
+
+
+def _compact_journal(journal, snapshot_file: str, results: Dict[str, Optional[Dict[str, str]]]) -> None:
+    """Fold the journal into the snapshot, then truncate the journal."""
+    journal.flush()
+    _write_snapshot(snapshot_file, results)
+    journal.seek(0)
+    journal.truncate()
+    logger.info(f"Compacted {len(results)} results into {snapshot_file}")
+
+
+def _results_writer(
+    write_queue: queue.Queue,
+    results: Dict[str, Optional[Dict[str, str]]],
+    journal_file: str,
+    snapshot_file: str,
+    failed_log_file: str,
+    flush_every: int,
+) -> None:
+    """
+    Background writer thread that exclusively owns `results` and the output files.
+
+    Queue items are (zipcode, crime_data, failure_note); None stops the thread
+    after a final compaction. Because only this thread mutates `results` or
+    touches disk, the scraping loop needs no lock and never blocks on I/O.
+    Journal entries and failed zipcodes are flushed together every
+    `flush_every` results or FLUSH_INTERVAL seconds, whichever comes first.
+    """
+    pending = 0 # Results written since the last flush
+    since_compact = 0 # Results journaled since the last compaction
+    failed_lines = []
+    last_flush = time.monotonic()
+    with open(journal_file, 'ab') as journal, open(failed_log_file, 'a') as failed_log:
+        while True:
+            try:
+                item = write_queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = () # Idle tick: only check whether a flush is due
+            if item is None:
+                break
+
+            if item:
+                zipcode, crime_data, failure_note = item
+                results[zipcode] = crime_data
+                try:
+                    journal.write(orjson.dumps({zipcode: crime_data}) + b'\n')
+                except IOError as e:
+                    logger.error(f"Error journaling result for {zipcode}: {e}")
+                if crime_data is None:
+                    failed_lines.append(f"{zipcode}{failure_note}\n")
+                pending += 1
+                since_compact += 1
+
+            if pending and (pending >= flush_every or time.monotonic() - last_flush >= FLUSH_INTERVAL):
+                try:
+                    journal.flush()
+                    failed_log.writelines(failed_lines)
+                    failed_log.flush()
+                    failed_lines.clear()
+                    if since_compact >= flush_every * COMPACT_EVERY_BATCHES:
+                        _compact_journal(journal, snapshot_file, results)
+                        since_compact = 0
+                except IOError as e:
+                    logger.error(f"Error flushing crime grade results: {e}")
+                pending = 0
+                last_flush = time.monotonic()
+
+        # --- Final Save ---
+        logger.info(f"Saving final data to {snapshot_file}...")
+        try:
+            failed_log.writelines(failed_lines)
+            failed_log.flush()
+            _compact_journal(journal, snapshot_file, results)
+            logger.info("Final data saved successfully.")
+        except IOError as e:
+            logger.error(f"Error writing final data to {snapshot_file}: {e}")
+
+
+# --- Processing Function (Concurrent via asyncio) ---
 def process_zipcodes(zipcodes: List[str], max_workers: int = 10, save_batch_size: int = 50) -> Dict[str, Optional[Dict[str, str]]]:
     """
-    Process zipcodes concurrently using ScraperAPI, load existing data,
+    Process zipcodes concurrently via Bright Data, load existing data,
     and save results periodically.
+
+    Thin synchronous wrapper around _process_zipcodes_async so CLI usage is unchanged.
     """
-    results = {}
+    return asyncio.run(_process_zipcodes_async(zipcodes, max_workers, save_batch_size))
+
+
+async def _process_zipcodes_async(zipcodes: List[str], max_workers: int, save_batch_size: int) -> Dict[str, Optional[Dict[str, str]]]:
+    """Fan out crime grade fetches over one HTTP/2 client, at most max_workers in flight."""
     failed_zipcodes_log = 'data/failed_zipcodes_crime.txt'
-    output_json_file = 'data/crime_grades.json'
-    # Lock for thread-safe access to results dictionary and file writing
-    lock = threading.Lock()
-    processed_in_batch = 0 # Counter for periodic saving
+    output_json_file = 'data/crime_grades.json.zst'
+    journal_file = 'data/crime_grades.jsonl'
 
-    # Load existing results (outside the lock initially)
-    if os.path.exists(output_json_file):
-        try:
-            with open(output_json_file, 'r') as file:
-                results = json.load(file)
-            logger.info(f"Loaded {len(results)} existing crime grade results from {output_json_file}")
-        except (json.JSONDecodeError, IOError) as e:
-             logger.error(f"Error loading existing results from {output_json_file}: {e}. Starting fresh.")
-             results = {}
-    else:
-        logger.info(f"No existing results file found at {output_json_file}, starting fresh.")
+    # Load existing results (snapshot + journal)
+    results = _load_results(output_json_file, journal_file)
 
     # Prepare list of zipcodes to process
     zipcodes_to_process = []
+    seen = set() # Duplicates would be scraped (and billed) more than once
     processed_count = 0
     for zipcode_raw in zipcodes:
          zipcode = str(zipcode_raw).strip()
          if not zipcode:
              continue
-         # Check existing results (read-only access, no lock needed here)
-         if zipcode in results and results[zipcode] is not None:
+         # Restore leading zeros lost when zipcodes were stored as numbers (e.g. 2134 -> 02134)
+         if zipcode.isdigit() and len(zipcode) < 5:
+             zipcode = zipcode.zfill(5)
+         if zipcode in seen:
+             continue
+         seen.add(zipcode)
+         # Skip zipcodes that already have results
+         if results.get(zipcode) is not None:
              processed_count += 1
              continue
          zipcodes_to_process.append(zipcode)
@@ -221,85 +427,69 @@ def process_zipcodes(zipcodes: List[str], max_workers: int = 10, save_batch_size
         return results
 
     total_failed = 0 # Track failures within this run
+    semaphore = asyncio.Semaphore(max_workers)
+
+    # From here on the writer thread owns `results`; this loop only enqueues
+    write_queue = queue.Queue()
+    writer = threading.Thread(
+        target=_results_writer,
+        args=(write_queue, results, journal_file, output_json_file, failed_zipcodes_log, save_batch_size),
+        name="crime-grade-writer",
+        daemon=True,
+    )
+    writer.start()
 
-    # Use ThreadPoolExecutor for concurrent scraping
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Map future back to zipcode
-        future_to_zipcode = {
-            executor.submit(search_crime_grade, zipcode): zipcode
-            for zipcode in zipcodes_to_process
-        }
-
-        # Process futures as they complete
-        progress_bar = tqdm(as_completed(future_to_zipcode), total=len(zipcodes_to_process), desc="Fetching Crime Grades")
-        for future in progress_bar:
-            zipcode = future_to_zipcode[future]
-            current_batch_size = 0 # Local variable to track batch size inside loop
+    try:
+        async with new_async_client(CRIME_MAX_IN_FLIGHT) as client:
 
-            try:
-                # Get the result from the future (the crime grade dict or None)
-                crime_data = future.result()
-
-                # --- Critical Section Start ---
-                with lock:
-                    if crime_data:
-                        results[zipcode] = crime_data
-                    else:
-                        # Store None to indicate failure and avoid reprocessing
-                        results[zipcode] = None
-                        total_failed += 1
-                        # Log failed zipcode to the separate file
-                        try:
-                            with open(failed_zipcodes_log, 'a') as f:
-                                f.write(f"{zipcode}\n")
-                        except IOError as e:
-                            logger.error(f"Could not write to failed zipcodes log {failed_zipcodes_log}: {e}")
-
-                    processed_in_batch += 1
-                    current_batch_size = processed_in_batch # Capture size for logging
-
-                    # Save progress periodically inside the lock
-                    if processed_in_batch >= save_batch_size:
-                        logger.info(f"Saving batch of {processed_in_batch} results...")
-                        try:
-                            with open(output_json_file, 'w') as f:
-                                json.dump(results, f, indent=2)
-                            processed_in_batch = 0 # Reset batch counter after successful save
-                        except IOError as e:
-                             logger.error(f"Error writing batch data to {output_json_file}: {e}")
-                             # Keep batch counter as is, will try saving again next time or at the end
-                # --- Critical Section End ---
-
-            except Exception as exc:
-                # Catch exceptions from future.result() itself (should be rare if search_crime_grade handles its own errors)
-                logger.error(f"[ERROR] Processing zipcode {zipcode} generated an exception: {exc}")
-                # --- Critical Section Start ---
-                with lock:
-                    results[zipcode] = None # Mark as failed
-                    total_failed += 1
+            async def bounded(zipcode: str):
+                # Returns (zipcode, crime_data, exception) so failures keep their zipcode
+                async with semaphore:
                     try:
-                        with open(failed_zipcodes_log, 'a') as f:
-                            f.write(f"{zipcode} (exception)\n")
-                    except IOError as e:
-                        logger.error(f"Could not write to failed zipcodes log {failed_zipcodes_log}: {e}")
-                # --- Critical Section End ---
-
-            # Update tqdm description (optional)
-            # progress_bar.set_postfix_str(f"Last: {zipcode}, Batch: {current_batch_size}/{save_batch_size}")
-
-
-    # --- Final Save ---
-    # Acquire lock one last time to save any remaining results and get final counts
-    with lock:
-        final_success_count = sum(1 for res in results.values() if res is not None)
-        logger.info(f"Scraping complete. Success: {final_success_count}, Failed this run: {total_failed}. Total entries in file: {len(results)}")
-        logger.info(f"Saving final data to {output_json_file}...")
-        try:
-            with open(output_json_file, 'w') as f:
-                json.dump(results, f, indent=2)
-            logger.info("Final data saved successfully.")
-        except IOError as e:
-            logger.error(f"Error writing final data to {output_json_file}: {e}")
+                        return zipcode, await search_crime_grade_async(zipcode, client), None
+                    except Exception as exc:
+                        return zipcode, None, exc
+
+            # Keep a bounded window of tasks instead of one per zipcode up front, so
+            # memory stays flat no matter how long the input list is
+            window = max_workers * INFLIGHT_PER_WORKER
+            remaining = iter(zipcodes_to_process)
+            pending = set()
+
+            def refill():
+                for zipcode in remaining:
+                    pending.add(asyncio.create_task(bounded(zipcode)))
+                    if len(pending) >= window:
+                        break
+
+            # Process results as they complete, topping the window back up each time
+            with tqdm(total=len(zipcodes_to_process), desc="Fetching Crime Grades") as progress_bar:
+                refill()
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        zipcode, crime_data, exc = task.result()
+
+                        if exc is not None:
+                            # Exceptions escaping search_crime_grade_async (rare, it handles its own errors)
+                            logger.error(f"[ERROR] Processing zipcode {zipcode} generated an exception: {exc}")
+                            total_failed += 1
+                            write_queue.put((zipcode, None, " (exception)"))
+                        elif crime_data:
+                            write_queue.put((zipcode, crime_data, ""))
+                        else:
+                            # Store None to indicate failure and avoid reprocessing
+                            total_failed += 1
+                            write_queue.put((zipcode, None, ""))
+                        progress_bar.update(1)
+                    refill()
+    finally:
+        write_queue.put(None)
+        writer.join()
+
+    # The writer has exited, so results is a stable snapshot again
+    final_success_count = sum(1 for res in results.values() if res is not None)
+    logger.info(f"Scraping complete. Success: {final_success_count}, Failed this run: {total_failed}. Total entries in file: {len(results)}")
 
     return results
 
@@ -327,7 +517,7 @@ if __name__ == "__main__":
         zipcodes_from_file = [] # Ensure it's a list
 
     if zipcodes_from_file:
-        # Set desired number of worker threads
+        # Set desired number of concurrent requests
         num_workers = 5 # Adjust as needed based on ScraperAPI plan and system resources
         batch_size = 5 # Adjust how often to save
 
@@ -2,99 +2,173 @@
 Property details fetcher using Bright Data Web Unlocker.
 Fetches detailed property information from Zillow using property ID or URL.
 """
+import asyncio
 import atexit
-import json
 import logging
 import os
 import re
+import sqlite3
 import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from html import unescape
-from json import loads
 from pathlib import Path
-from typing import Any
-from urllib.parse import quote
+from typing import Any, Iterable
 
+import httpx
+import orjson
 import requests
-from dotenv import load_dotenv
-import urllib3
-
-# Suppress SSL warnings for Bright Data proxy
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-# Load environment variables from .env file
-load_dotenv(Path(__file__).parent.parent / ".env")
+import zstandard as zstd
+
+from brightdata import (
+    ASYNC_MAX_CONNECTIONS,
+    BACKOFF_BASE,
+    BRIGHTDATA_PASSWORD,
+    BRIGHTDATA_USERNAME,
+    MAX_RETRIES,
+    REQUEST_TIMEOUT,
+    get_session,
+    new_async_client,
+    rate_limiter,
+    retry_delay,
+)
 
 logger = logging.getLogger(__name__)
 
-# Configuration - Bright Data Web Unlocker
-BRIGHTDATA_HOST = os.environ.get("BRIGHTDATA_HOST", "brd.superproxy.io")
-BRIGHTDATA_PORT = int(os.environ.get("BRIGHTDATA_PORT", "33335"))
-BRIGHTDATA_USERNAME = os.environ.get("BRIGHTDATA_USERNAME")
-BRIGHTDATA_PASSWORD = os.environ.get("BRIGHTDATA_PASSWORD")
-
 if not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
     logger.warning("BRIGHTDATA_USERNAME or BRIGHTDATA_PASSWORD not set - school ratings will fail")
 
-REQUEST_TIMEOUT = 60
-
-# Cache configuration - thread-safe in-memory cache with disk persistence
-CACHE_FILE = Path(__file__).parent / "data" / "school_cache.json"
-_cache: dict = {}
+# Cache configuration - property details persisted in SQLite (WAL mode), one row
+# per zpid, so lookups and inserts cost the same no matter how big the cache gets.
+CACHE_DIR = Path(__file__).parent / "data"
+CACHE_DB_FILE = CACHE_DIR / "school_cache.db"
+# Flat-file cache written by older versions; imported once into an empty database
+LEGACY_CACHE_FILES = (CACHE_DIR / "school_cache.json.zst", CACHE_DIR / "school_cache.json")
+LEGACY_CACHE_JOURNAL_FILE = CACHE_DIR / "school_cache.jsonl"
 _cache_lock = threading.Lock()
-_cache_dirty = False  # Track if cache needs to be saved
+_db_lock = threading.Lock()  # A sqlite3 connection must not be used by two threads at once
+# Hot zpids are served from a bounded in-memory LRU without touching SQLite
+MEMO_SIZE = 4096
+_memo: OrderedDict[str, dict] = OrderedDict()  # Guarded by _db_lock
+
+# Fetches currently in progress, keyed by zpid, so concurrent cache misses on
+# the same property share one Bright Data round-trip (guarded by _cache_lock)
+_inflight: dict[str, Future] = {}
+# Same for the async path: each fetch runs as its own task that every caller
+# awaits through a shield; only touched from the event loop thread, so no lock
+_inflight_async: dict[str, asyncio.Task] = {}
+
+# Parsing a property page is CPU-bound and holds the GIL, so async fetches parse in
+# worker processes (0 = parse in a thread). The pool is per server worker, so the
+# default stays small to avoid oversubscribing the host under several workers
+PARSE_PROCESSES = int(os.environ.get("DETAILS_PARSE_PROCESSES", min(4, os.cpu_count() or 1)))
+_parse_pool: ProcessPoolExecutor | None = None
+
+# Property page URL for a zpid (bound str.__mod__, so formatting is a single C call)
+_PROPERTY_URL = "https://www.zillow.com/homedetails/property/%s_zpid/".__mod__
+
+# The Next.js data island holding all property data
+_NEXT_DATA_RE = re.compile(rb'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+
+
+def _load_legacy_cache() -> dict[str, Any]:
+    """Read the old zstd/JSON snapshot plus its JSONL journal, if present."""
+    cache = {}
+    for legacy_file in LEGACY_CACHE_FILES:
+        if not legacy_file.exists():
+            continue
+        try:
+            raw = legacy_file.read_bytes()
+            if legacy_file.suffix == ".zst":
+                raw = zstd.ZstdDecompressor().decompress(raw)
+            cache = orjson.loads(raw)
+        except (orjson.JSONDecodeError, zstd.ZstdError, IOError) as e:
+            logger.warning(f"Failed to load legacy cache {legacy_file}: {e}")
+        break
+
+    # Replay entries journaled since the last snapshot (last one wins)
+    if LEGACY_CACHE_JOURNAL_FILE.exists():
+        try:
+            with open(LEGACY_CACHE_JOURNAL_FILE, "rb") as f:
+                for line in f:
+                    try:
+                        cache.update(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        logger.warning("Skipping malformed line in legacy cache journal")
+        except IOError as e:
+            logger.warning(f"Failed to read legacy cache journal: {e}")
 
-# Regex for cleaning whitespace
-REGEX_SPACE = re.compile(r"[\s ]+")
+    return cache
 
 
-def _remove_space(value: str) -> str:
-    """Remove unwanted spaces in given string."""
-    return REGEX_SPACE.sub(" ", value.strip())
+def _init_cache() -> sqlite3.Connection:
+    """Open (and if needed create) the cache database (called once, on first use)."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(CACHE_DB_FILE, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("CREATE TABLE IF NOT EXISTS props (zpid TEXT PRIMARY KEY, json BLOB NOT NULL)")
 
+    if db.execute("SELECT 1 FROM props LIMIT 1").fetchone() is None:
+        legacy = _load_legacy_cache()
+        if legacy:
+            db.executemany(
+                "INSERT OR REPLACE INTO props (zpid, json) VALUES (?, ?)",
+                ((zpid, orjson.dumps(data)) for zpid, data in legacy.items()),
+            )
+            logger.info(f"Imported {len(legacy)} entries from legacy school cache")
+    db.commit()
+    return db
 
-def _init_cache() -> None:
-    """Initialize the in-memory cache from disk (called once at module load)."""
-    global _cache
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE) as f:
-                _cache = json.load(f)
-            logger.info(f"Loaded {len(_cache)} entries from school cache")
-        except (json.JSONDecodeError, IOError) as e:
-            logger.warning(f"Failed to load cache: {e}")
-            _cache = {}
-    else:
-        _cache = {}
 
+def _get_db() -> sqlite3.Connection:
+    """Return the cache database, opening it on first use (caller holds _db_lock)."""
+    global _db
+    if _db is None:
+        _db = _init_cache()
+    return _db
 
-def _save_cache_to_disk() -> None:
-    """Save the in-memory cache to disk (thread-safe)."""
-    global _cache_dirty
-    with _cache_lock:
-        if not _cache_dirty:
-            return
-        try:
-            CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(CACHE_FILE, "w") as f:
-                json.dump(_cache, f, indent=2)
-            _cache_dirty = False
-            logger.info(f"Saved {len(_cache)} entries to school cache")
-        except IOError as e:
-            logger.error(f"Failed to save cache: {e}")
+
+def _memo_put(zpid: str, data: dict) -> None:
+    """Insert into the LRU, evicting the least recently used entry when full (caller holds _db_lock)."""
+    _memo[zpid] = data
+    _memo.move_to_end(zpid)
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
 
 
 def _cache_get(zpid: str) -> dict | None:
     """Thread-safe cache lookup."""
-    with _cache_lock:
-        return _cache.get(zpid)
+    with _db_lock:
+        data = _memo.get(zpid)
+        if data is not None:
+            _memo.move_to_end(zpid)
+            return data
+        row = _get_db().execute("SELECT json FROM props WHERE zpid = ?", (zpid,)).fetchone()
+        if row is None:
+            return None
+        data = orjson.loads(row[0])
+        _memo_put(zpid, data)
+        return data
 
 
 def _cache_set(zpid: str, data: dict) -> None:
     """Thread-safe cache insert."""
-    global _cache_dirty
-    with _cache_lock:
-        _cache[zpid] = data
-        _cache_dirty = True
+    blob = orjson.dumps(data)
+    with _db_lock:
+        db = _get_db()
+        db.execute("INSERT OR REPLACE INTO props (zpid, json) VALUES (?, ?)", (zpid, blob))
+        db.commit()
+        _memo_put(zpid, data)
+
+
+def _save_cache_to_disk() -> None:
+    """Checkpoint the write-ahead log into the main database file."""
+    with _db_lock:
+        if _db is not None:
+            _db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
 
 def save_school_cache() -> None:
@@ -102,74 +176,139 @@ def save_school_cache() -> None:
     _save_cache_to_disk()
 
 
-# Initialize cache at module load
-_init_cache()
+# Opened on first use rather than at import, so parser processes (which
+# re-import this module under spawn/forkserver) never touch the database
+_db: sqlite3.Connection | None = None
 
 # Save cache when the process exits
 atexit.register(_save_cache_to_disk)
 
 
-def _get_nested_value(dic: dict, key_path: str, default=None) -> Any:
-    """Get a nested value from a dictionary using dot notation."""
-    keys = key_path.split(".")
-    current = dic
-    for key in keys:
-        if isinstance(current, dict):
-            current = current.get(key, {})
-        else:
-            return default
-        if current == {} or current is None:
-            return default
-    return current
+# Shared async client for FastAPI handlers (created lazily on the server's event loop)
+_async_client: httpx.AsyncClient | None = None
 
 
 def _make_brightdata_request(target_url: str) -> requests.Response:
-    """Makes a request to the target URL via Bright Data Web Unlocker proxy."""
+    """Makes a request to the target URL via Bright Data Web Unlocker proxy, with retries."""
     if not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
         raise RuntimeError("Bright Data credentials not configured")
 
-    # Encode password in case it contains special characters
-    encoded_password = quote(BRIGHTDATA_PASSWORD, safe='')
-    proxy_url = f"http://{BRIGHTDATA_USERNAME}:{encoded_password}@{BRIGHTDATA_HOST}:{BRIGHTDATA_PORT}"
-    proxies = {"http": proxy_url, "https": proxy_url}
+    wait_time = BACKOFF_BASE
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            rate_limiter.wait()
+            response = get_session().get(target_url, timeout=REQUEST_TIMEOUT)
+
+            # Rate limited or server error - back off and retry
+            if (response.status_code == 429 or response.status_code >= 500) and attempt < MAX_RETRIES:
+                wait_time = retry_delay(wait_time, response)
+                logger.warning(
+                    f"Got {response.status_code} for {target_url}. "
+                    f"Retrying in {wait_time:.2f} seconds ({attempt + 1}/{MAX_RETRIES})..."
+                )
+                time.sleep(wait_time)
+                continue
+
+            response.raise_for_status()
+            return response
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout) and attempt < MAX_RETRIES:
+                logger.warning(f"Request timed out for {target_url} ({attempt + 1}/{MAX_RETRIES}), retrying...")
+                wait_time = retry_delay(wait_time)
+                time.sleep(wait_time)
+                continue
+            status_code = e.response.status_code if e.response is not None else "N/A"
+            response_text = e.response.text[:200] if e.response is not None else "N/A"
+            logger.error(f"Error fetching {target_url} via Bright Data. Status Code: {status_code}")
+            logger.error(f"Exception Type: {type(e).__name__}")
+            logger.error(f"Response Body (first 200 chars): {response_text}")
+            raise
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = new_async_client()
+    return _async_client
+
+
+def open_async_client() -> None:
+    """Create the shared async client up front (call on app startup)."""
+    _get_async_client()
+
+
+async def close_async_client() -> None:
+    """Close the shared async client and its pooled connections (call on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def _make_brightdata_request_async(target_url: str, client: httpx.AsyncClient | None = None) -> httpx.Response:
+    """Async counterpart of _make_brightdata_request with the same retry policy."""
+    if not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
+        raise RuntimeError("Bright Data credentials not configured")
 
-    try:
-        response = requests.get(
-            target_url,
-            proxies=proxies,
-            verify=False,  # Bright Data may require this for SSL
-            timeout=REQUEST_TIMEOUT
-        )
-        response.raise_for_status()
-        return response
-    except requests.exceptions.RequestException as e:
-        status_code = e.response.status_code if e.response is not None else "N/A"
-        response_text = e.response.text[:200] if e.response is not None else "N/A"
-        logger.error(f"Error fetching {target_url} via Bright Data. Status Code: {status_code}")
-        logger.error(f"Exception Type: {type(e).__name__}")
-        logger.error(f"Response Body (first 200 chars): {response_text}")
-        raise
+    client = client or _get_async_client()
+    wait_time = BACKOFF_BASE
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            await rate_limiter.wait_async()
+            response = await client.get(target_url)
+
+            # Rate limited or server error - back off and retry
+            if (response.status_code == 429 or response.status_code >= 500) and attempt < MAX_RETRIES:
+                wait_time = retry_delay(wait_time, response)
+                logger.warning(
+                    f"Got {response.status_code} for {target_url}. "
+                    f"Retrying in {wait_time:.2f} seconds ({attempt + 1}/{MAX_RETRIES})..."
+                )
+                await asyncio.sleep(wait_time)
+                continue
+
+            response.raise_for_status()
+            return response
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.TimeoutException) and attempt < MAX_RETRIES:
+                logger.warning(f"Request timed out for {target_url} ({attempt + 1}/{MAX_RETRIES}), retrying...")
+                wait_time = retry_delay(wait_time)
+                await asyncio.sleep(wait_time)
+                continue
+            error_response = e.response if isinstance(e, httpx.HTTPStatusError) else None
+            status_code = error_response.status_code if error_response is not None else "N/A"
+            response_text = error_response.text[:200] if error_response is not None else "N/A"
+            logger.error(f"Error fetching {target_url} via Bright Data. Status Code: {status_code}")
+            logger.error(f"Exception Type: {type(e).__name__}")
+            logger.error(f"Response Body (first 200 chars): {response_text}")
+            raise
+
+
+def _component_props(data: dict) -> dict[str, Any]:
+    """Return data["props"]["pageProps"]["componentProps"], or {} if any level is missing."""
+    page_props = (data.get("props") or {}).get("pageProps") or {}
+    return page_props.get("componentProps") or {}
 
 
 def _parse_html_for_json(body: bytes) -> dict[str, Any]:
     """Parse HTML content to retrieve JSON data from __NEXT_DATA__ script tag."""
-    try:
-        from bs4 import BeautifulSoup
-    except ImportError:
-        raise ImportError("beautifulsoup4 is required. Install with: pip install beautifulsoup4")
-
-    soup = BeautifulSoup(body, "html.parser")
-    selection = soup.select_one("#__NEXT_DATA__")
-
-    if not selection:
+    # Slice the script tag straight out of the raw bytes, no DOM needed
+    match = _NEXT_DATA_RE.search(body)
+    if not match:
         logger.error("Could not find __NEXT_DATA__ script tag in HTML")
         return {}
 
-    html_data = selection.getText()
-    html_data = _remove_space(unescape(html_data))
-    data = loads(html_data)
+    # Script contents are normally not entity-escaped, so only unescape when needed;
+    # otherwise orjson parses a zero-copy view of the page bytes (no multi-MB slice copy)
+    start, end = match.span(1)
+    if body.find(b"&", start, end) != -1:
+        raw = unescape(body[start:end].decode("utf-8"))
+    else:
+        raw = memoryview(body)[start:end]
+    data = orjson.loads(raw)
 
-    return _get_nested_value(data, "props.pageProps.componentProps", {})
+    return _component_props(data)
 
 
 def _parse_property_data(body: bytes) -> dict[str, Any]:
@@ -180,25 +319,22 @@ def _parse_property_data(body: bytes) -> dict[str, Any]:
         return {}
 
     # Extract property data from gdpClientCache
-    gdp_cache_raw = _get_nested_value(component_props, "gdpClientCache")
+    gdp_cache_raw = component_props.get("gdpClientCache")
     if not gdp_cache_raw:
         logger.error("Could not find gdpClientCache in component props")
         return {}
 
     try:
-        property_json = loads(gdp_cache_raw)
+        property_json = orjson.loads(gdp_cache_raw)
     except (TypeError, ValueError) as e:
         logger.error(f"Failed to parse gdpClientCache JSON: {e}")
         return {}
 
-    # Find property data in the parsed JSON
-    parsed_data = {}
-    for data in property_json.values():
-        if isinstance(data, dict) and "property" in data:
-            parsed_data = data.get("property", {})
-            break
-
-    return parsed_data
+    # The property data sits under the first cache entry that has a "property" key
+    return next(
+        (data["property"] for data in property_json.values() if isinstance(data, dict) and "property" in data),
+        {},
+    )
 
 
 def get_property_details_by_zpid(zpid: int | str) -> dict[str, Any]:
@@ -216,7 +352,7 @@ def get_property_details_by_zpid(zpid: int | str) -> dict[str, Any]:
         - Media: images, 3D tours, videos
         - Market data: zestimate, rent estimate, days on Zillow
     """
-    zpid_str = str(zpid)
+    zpid_str = zpid if type(zpid) is str else str(zpid)
 
     # Check cache first (thread-safe)
     cached = _cache_get(zpid_str)
@@ -224,16 +360,36 @@ def get_property_details_by_zpid(zpid: int | str) -> dict[str, Any]:
         logger.info(f"Cache hit for zpid: {zpid_str}")
         return cached
 
-    # Fetch from API
-    logger.info(f"Cache miss for zpid: {zpid_str}, fetching from API")
-    home_url = f"https://www.zillow.com/homedetails/property/{zpid_str}_zpid/"
-    details = get_property_details_by_url(home_url)
-
-    # Save to cache (thread-safe)
-    if details:
-        _cache_set(zpid_str, details)
+    # Join a fetch already in flight for this zpid, or register our own
+    with _cache_lock:
+        cached = _cache_get(zpid_str)
+        future = _inflight.get(zpid_str)
+        is_owner = cached is None and future is None
+        if is_owner:
+            future = _inflight[zpid_str] = Future()
+    if cached is not None:
+        return cached
+    if not is_owner:
+        logger.info(f"Waiting for in-flight fetch of zpid: {zpid_str}")
+        return future.result()
 
-    return details
+    try:
+        # Fetch from API
+        logger.info(f"Cache miss for zpid: {zpid_str}, fetching from API")
+        home_url = _PROPERTY_URL(zpid_str)
+        details = get_property_details_by_url(home_url)
+
+        # Save to cache (thread-safe) before waiters are released
+        if details:
+            _cache_set(zpid_str, details)
+        future.set_result(details)
+        return details
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _cache_lock:
+            _inflight.pop(zpid_str, None)
 
 
 def get_property_details_by_url(home_url: str) -> dict[str, Any]:
@@ -252,6 +408,15 @@ def get_property_details_by_url(home_url: str) -> dict[str, Any]:
     return data
 
 
+# Scalar fields copied into the summary (None when missing)
+_SUMMARY_KEYS = (
+    "zpid", "url", "homeStatus", "price", "zestimate", "rentZestimate",
+    "bedrooms", "bathrooms", "livingArea", "lotSize", "yearBuilt", "homeType",
+    "daysOnZillow", "monthlyHoaFee", "taxAssessedValue", "description",
+    "latitude", "longitude",
+)
+
+
 def extract_summary_from_details(details: dict[str, Any]) -> dict[str, Any]:
     """
     Extract a summary of key fields from the full property details.
@@ -265,52 +430,172 @@ def extract_summary_from_details(details: dict[str, Any]) -> dict[str, Any]:
     if not details:
         return {}
 
+    (
+        zpid, url, status, price, zestimate, rent_zestimate,
+        beds, baths, area, lot_size, year_built, home_type,
+        days_on_zillow, monthly_hoa, tax_assessed_value, description,
+        latitude, longitude,
+    ) = map(details.get, _SUMMARY_KEYS)
+
     # Extract address components
-    address = _get_nested_value(details, "address", {})
+    address = details.get("address") or {}
+    street = address.get("streetAddress")
+    city = address.get("city")
+    state = address.get("state")
+    zipcode = address.get("zipcode")
+    # "street, city, state zip", leaving out missing parts instead of printing "None"
+    state_zip = " ".join(filter(None, (state, zipcode)))
+    full_address = ", ".join(filter(None, (street, city, state_zip)))
+
+    photos = details.get("photos")
 
     return {
-        "zpid": details.get("zpid"),
-        "url": details.get("url"),
-        "status": details.get("homeStatus"),
-        "price": details.get("price"),
-        "zestimate": details.get("zestimate"),
-        "rent_zestimate": details.get("rentZestimate"),
+        "zpid": zpid,
+        "url": url,
+        "status": status,
+        "price": price,
+        "zestimate": zestimate,
+        "rent_zestimate": rent_zestimate,
         "address": {
-            "street": address.get("streetAddress"),
-            "city": address.get("city"),
-            "state": address.get("state"),
-            "zipcode": address.get("zipcode"),
-            "full": f"{address.get('streetAddress', '')}, {address.get('city', '')}, {address.get('state', '')} {address.get('zipcode', '')}",
+            "street": street,
+            "city": city,
+            "state": state,
+            "zipcode": zipcode,
+            "full": full_address,
         },
-        "beds": details.get("bedrooms"),
-        "baths": details.get("bathrooms"),
-        "area": details.get("livingArea"),
-        "lot_size": details.get("lotSize"),
-        "year_built": details.get("yearBuilt"),
-        "home_type": details.get("homeType"),
-        "days_on_zillow": details.get("daysOnZillow"),
-        "monthly_hoa": details.get("monthlyHoaFee"),
-        "tax_assessed_value": details.get("taxAssessedValue"),
+        "beds": beds,
+        "baths": baths,
+        "area": area,
+        "lot_size": lot_size,
+        "year_built": year_built,
+        "home_type": home_type,
+        "days_on_zillow": days_on_zillow,
+        "monthly_hoa": monthly_hoa,
+        "tax_assessed_value": tax_assessed_value,
         "schools": details.get("schools", []),
-        "description": details.get("description"),
-        "photos": [p.get("url") for p in details.get("photos", [])[:5]] if details.get("photos") else [],
-        "latitude": _get_nested_value(details, "latitude"),
-        "longitude": _get_nested_value(details, "longitude"),
+        "description": description,
+        "photos": [p.get("url") for p in photos[:5]] if photos else [],
+        "latitude": latitude,
+        "longitude": longitude,
     }
 
 
-# Async wrapper for FastAPI
+# Native async variants for FastAPI
 async def get_property_details_by_zpid_async(zpid: int | str) -> dict[str, Any]:
-    """Async wrapper for get_property_details_by_zpid."""
-    import asyncio
+    """Async version of get_property_details_by_zpid using the shared HTTP/2 client."""
+    zpid_str = zpid if type(zpid) is str else str(zpid)
+
+    cached = _cache_get(zpid_str)
+    if cached is not None:
+        logger.info(f"Cache hit for zpid: {zpid_str}")
+        return cached
+
+    # Join a fetch already in flight for this zpid, or start one
+    task = _inflight_async.get(zpid_str)
+    if task is not None:
+        logger.info(f"Waiting for in-flight fetch of zpid: {zpid_str}")
+    else:
+        task = _inflight_async[zpid_str] = asyncio.ensure_future(_fetch_details_by_zpid_async(zpid_str))
+        task.add_done_callback(lambda t: _finish_inflight_async(zpid_str, t))
+    # The fetch is detached from its callers: cancelling one caller (e.g. its
+    # client disconnected) neither cancels the fetch nor fails the other waiters
+    return await asyncio.shield(task)
+
+
+async def _fetch_details_by_zpid_async(zpid_str: str) -> dict[str, Any]:
+    logger.info(f"Cache miss for zpid: {zpid_str}, fetching from API")
+    home_url = _PROPERTY_URL(zpid_str)
+    details = await get_property_details_by_url_async(home_url)
+
+    if details:
+        _cache_set(zpid_str, details)
+    return details
+
+
+def _finish_inflight_async(zpid_str: str, task: asyncio.Task) -> None:
+    if _inflight_async.get(zpid_str) is task:
+        del _inflight_async[zpid_str]
+    if not task.cancelled():
+        task.exception()  # Mark retrieved in case every caller was cancelled before it finished
+
+
+async def get_property_details_by_url_async(home_url: str, client: httpx.AsyncClient | None = None) -> dict[str, Any]:
+    """Async version of get_property_details_by_url (shared HTTP/2 client unless one is given)."""
+    logger.info(f"Fetching property details from: {home_url}")
+    response = await _make_brightdata_request_async(home_url, client)
+    return await _parse_property_data_async(response.content)
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Return the parser process pool, starting it on first use."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES)
+    return _parse_pool
+
+
+def _shutdown_parse_pool() -> None:
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
 
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: get_property_details_by_zpid(zpid))
 
+atexit.register(_shutdown_parse_pool)
+
+
+async def _parse_property_data_async(body: bytes) -> dict[str, Any]:
+    """Run _parse_property_data off the event loop (process pool, else a worker thread)."""
+    global _parse_pool
+    if PARSE_PROCESSES > 0:
+        pool = _get_parse_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, _parse_property_data, body)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time, parse this one here.
+            # Concurrent parses see the same broken pool, only the first one replaces it
+            if _parse_pool is pool:
+                logger.warning("Parser process pool broke, recreating it")
+                _parse_pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+    return await asyncio.to_thread(_parse_property_data, body)
+
+
+async def _fetch_details_batch(zpids: list[str]) -> None:
+    """Fetch and cache details for the given zpids concurrently over one client."""
+    semaphore = asyncio.Semaphore(ASYNC_MAX_CONNECTIONS)
+
+    async with new_async_client() as client:
+
+        async def fetch(zpid_str: str) -> None:
+            home_url = _PROPERTY_URL(zpid_str)
+            async with semaphore:
+                try:
+                    details = await get_property_details_by_url_async(home_url, client)
+                except Exception as e:
+                    logger.error(f"Failed to fetch details for zpid {zpid_str}: {e}")
+                    return
+            if details:
+                _cache_set(zpid_str, details)
+
+        await asyncio.gather(*(fetch(zpid_str) for zpid_str in zpids))
+
+
+def get_property_details_by_zpids(zpids: Iterable[int | str]) -> dict[str, dict[str, Any]]:
+    """
+    Fetch detailed property information for many zpids at once.
+    Cached zpids are returned directly; only the misses are fetched, concurrently.
+    For synchronous callers (uses asyncio.run).
+
+    Args:
+        zpids: Zillow property IDs (ints or strings)
+
+    Returns:
+        Dictionary mapping each zpid (as a string) to its details ({} if the fetch failed)
+    """
+    zpid_strs = list(dict.fromkeys(zpid if type(zpid) is str else str(zpid) for zpid in zpids))
+    missing = [zpid_str for zpid_str in zpid_strs if _cache_get(zpid_str) is None]
 
-async def get_property_details_by_url_async(home_url: str) -> dict[str, Any]:
-    """Async wrapper for get_property_details_by_url."""
-    import asyncio
+    if missing:
+        logger.info(f"Fetching {len(missing)} of {len(zpid_strs)} zpids from API ({len(zpid_strs) - len(missing)} cached)")
+        asyncio.run(_fetch_details_batch(missing))
 
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: get_property_details_by_url(home_url))
+    return {zpid_str: _cache_get(zpid_str) or {} for zpid_str in zpid_strs}
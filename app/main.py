@@ -1,24 +1,43 @@
 """
 HouseHunters v2 - FastAPI Backend
 """
+import asyncio
 import csv
+import heapq
 import io
-import json
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import orjson
+import zstandard as zstd
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
-from zillow import parse_bounds_from_url, search_properties_async
-from details import get_property_details_by_zpid_async, save_school_cache
+from zillow import close_async_session, parse_bounds_from_url, search_properties_async
+from details import (
+    close_async_client,
+    get_property_details_by_zpid_async,
+    open_async_client,
+    save_school_cache,
+)
 
-app = FastAPI(title="HouseHunters", version="2.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared Bright Data client on startup; close it and the Zillow session on shutdown."""
+    open_async_client()
+    yield
+    await close_async_client()
+    await close_async_session()
+
+
+app = FastAPI(title="HouseHunters", version="2.0.0", lifespan=lifespan)
 
 # Setup static files and templates
 BASE_DIR = Path(__file__).resolve().parent
@@ -30,17 +49,23 @@ DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
 # Crime grades cache (loaded at startup)
-CRIME_GRADES_FILE = DATA_DIR / "crime_grades.json"
+CRIME_GRADES_FILE = DATA_DIR / "crime_grades.json.zst"
+LEGACY_CRIME_GRADES_FILE = DATA_DIR / "crime_grades.json"  # Uncompressed, from older scraper runs
 crime_grades_cache: dict = {}
 
 def load_crime_grades():
-    """Load crime grades from JSON file into memory cache."""
+    """Load crime grades from the compressed JSON snapshot into memory cache."""
     global crime_grades_cache
     if CRIME_GRADES_FILE.exists():
         try:
-            with open(CRIME_GRADES_FILE) as f:
-                crime_grades_cache = json.load(f)
-        except (json.JSONDecodeError, IOError):
+            with open(CRIME_GRADES_FILE, "rb") as f:
+                crime_grades_cache = orjson.loads(zstd.ZstdDecompressor().decompress(f.read()))
+        except (orjson.JSONDecodeError, zstd.ZstdError, IOError):
+            crime_grades_cache = {}
+    elif LEGACY_CRIME_GRADES_FILE.exists():
+        try:
+            crime_grades_cache = orjson.loads(LEGACY_CRIME_GRADES_FILE.read_bytes())
+        except (orjson.JSONDecodeError, IOError):
             crime_grades_cache = {}
 
 # Load crime grades at startup
@@ -63,6 +88,10 @@ class SearchRequest(BaseModel):
     property_types: dict[str, bool] = {}
 
 
+class DetailsBatchRequest(BaseModel):
+    zpids: list[str]
+
+
 class ExportRequest(BaseModel):
     results: list[dict[str, Any]]
     format: str = "json"  # "json" or "csv"
@@ -112,13 +141,13 @@ async def search(request: SearchRequest):
         save_data = {
             "search_type": request.search_type,
             "filters": filters,
-            "bounds": bounds,
+            "bounds": dict(bounds),
             "timestamp": timestamp,
             "results": results,
         }
 
-        with open(filepath, "w") as f:
-            json.dump(save_data, f, indent=2)
+        # Compact orjson bytes; pretty-printing multi-MB results is slow and bloats the file
+        filepath.write_bytes(orjson.dumps(save_data))
 
         return {
             "success": True,
@@ -135,26 +164,8 @@ async def search(request: SearchRequest):
 async def export_results(request: ExportRequest):
     """Export results as JSON or CSV."""
     if request.format == "csv":
-        # Create CSV in memory
-        output = io.StringIO()
-        if request.results:
-            # Use specified columns or extract all keys from first result
-            if request.columns:
-                fieldnames = request.columns
-            else:
-                fieldnames = list(request.results[0].keys())
-
-            writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction="ignore")
-            writer.writeheader()
-
-            for row in request.results:
-                # Flatten nested data
-                flat_row = flatten_dict(row)
-                writer.writerow({k: flat_row.get(k, "") for k in fieldnames})
-
-        output.seek(0)
         return StreamingResponse(
-            iter([output.getvalue()]),
+            iter_csv(request.results, request.columns),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=properties.csv"},
         )
@@ -166,16 +177,90 @@ async def export_results(request: ExportRequest):
         )
 
 
-def flatten_dict(d: dict, parent_key: str = "", sep: str = ".") -> dict:
-    """Flatten nested dictionary."""
-    items = []
-    for k, v in d.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep).items())
-        else:
-            items.append((new_key, v))
-    return dict(items)
+# Rows formatted per writerows() call; each batch is sent to the client as one chunk
+CSV_BATCH_ROWS = 1000
+
+
+def iter_csv(results: list[dict[str, Any]], columns: list[str]):
+    """Yield CSV text one CSV_BATCH_ROWS batch at a time, so large exports stream instead of buffering."""
+    if not results:
+        return
+
+    # Use specified columns or extract all keys from first result
+    fieldnames = columns or list(results[0].keys())
+
+    # Only flatten the parts of each row that can produce a requested column
+    wanted = wanted_prefixes(fieldnames)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(fieldnames)
+
+    for start in range(0, len(results), CSV_BATCH_ROWS):
+        # Flatten nested data; writerows formats the whole batch in C
+        flat_rows = (flatten_dict(row, wanted=wanted) for row in results[start:start + CSV_BATCH_ROWS])
+        writer.writerows([flat.get(k, "") for k in fieldnames] for flat in flat_rows)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+
+def wanted_prefixes(fieldnames: list[str], sep: str = ".") -> set[str]:
+    """Every key prefix of the given flattened field names ("a.b.c" -> a, a.b, a.b.c)."""
+    return {name.rsplit(sep, i)[0] for name in fieldnames for i in range(name.count(sep) + 1)}
+
+
+def flatten_dict(d: dict, parent_key: str = "", sep: str = ".", wanted: set[str] | None = None) -> dict:
+    """
+    Flatten nested dictionary. If `wanted` (see wanted_prefixes) is given,
+    subtrees that cannot produce one of those keys are skipped entirely.
+    """
+    flat = {}
+    stack = [(parent_key, d)]
+    while stack:
+        prefix, current = stack.pop()
+        for k, v in current.items():
+            new_key = f"{prefix}{sep}{k}" if prefix else k
+            if wanted is not None and new_key not in wanted:
+                continue
+            if isinstance(v, dict):
+                stack.append((new_key, v))
+            else:
+                flat[new_key] = v
+    return flat
+
+
+def school_ratings_summary(zpid: str, details: dict) -> dict:
+    """Summarize a property's school ratings by level."""
+    # Extract school ratings by level
+    schools = details.get("schools", [])
+    school_ratings = {
+        "elementary": None,
+        "middle": None,
+        "high": None,
+    }
+
+    for school in schools:
+        level = school.get("level", "").lower()
+        rating = school.get("rating")
+
+        if rating is not None:
+            if "elementary" in level:
+                school_ratings["elementary"] = rating
+            elif "middle" in level:
+                school_ratings["middle"] = rating
+            elif "high" in level:
+                school_ratings["high"] = rating
+
+    # Calculate total score (sum of available ratings)
+    total = sum(r for r in school_ratings.values() if r is not None)
+
+    return {
+        "zpid": zpid,
+        "schools": school_ratings,
+        "schoolRatingsTotal": total,
+        "schoolRatingsDisplay": f"{school_ratings['elementary'] or '-'}/{school_ratings['middle'] or '-'}/{school_ratings['high'] or '-'}",
+    }
 
 
 @app.get("/api/details/{zpid}")
@@ -187,35 +272,7 @@ async def get_property_details(zpid: str):
         if not details:
             raise HTTPException(status_code=404, detail="Property not found")
 
-        # Extract school ratings by level
-        schools = details.get("schools", [])
-        school_ratings = {
-            "elementary": None,
-            "middle": None,
-            "high": None,
-        }
-
-        for school in schools:
-            level = school.get("level", "").lower()
-            rating = school.get("rating")
-
-            if rating is not None:
-                if "elementary" in level:
-                    school_ratings["elementary"] = rating
-                elif "middle" in level:
-                    school_ratings["middle"] = rating
-                elif "high" in level:
-                    school_ratings["high"] = rating
-
-        # Calculate total score (sum of available ratings)
-        total = sum(r for r in school_ratings.values() if r is not None)
-
-        return {
-            "zpid": zpid,
-            "schools": school_ratings,
-            "schoolRatingsTotal": total,
-            "schoolRatingsDisplay": f"{school_ratings['elementary'] or '-'}/{school_ratings['middle'] or '-'}/{school_ratings['high'] or '-'}",
-        }
+        return school_ratings_summary(zpid, details)
 
     except HTTPException:
         raise
@@ -223,6 +280,33 @@ async def get_property_details(zpid: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Max detail fetches in flight for one batch request
+DETAILS_BATCH_CONCURRENCY = 32
+
+
+@app.post("/api/details/batch")
+async def get_property_details_batch(request: DetailsBatchRequest):
+    """Get school ratings for many properties concurrently (cached ones return immediately)."""
+    semaphore = asyncio.Semaphore(DETAILS_BATCH_CONCURRENCY)
+
+    async def fetch(zpid: str) -> dict:
+        async with semaphore:
+            return await get_property_details_by_zpid_async(zpid)
+
+    results = await asyncio.gather(*(fetch(zpid) for zpid in request.zpids), return_exceptions=True)
+
+    # Per-zpid errors are reported inline so one failure doesn't sink the batch
+    summaries = []
+    for zpid, details in zip(request.zpids, results):
+        if isinstance(details, BaseException):
+            summaries.append({"zpid": zpid, "error": str(details)})
+        elif not details:
+            summaries.append({"zpid": zpid, "error": "Property not found"})
+        else:
+            summaries.append(school_ratings_summary(zpid, details))
+    return summaries
+
+
 @app.get("/api/crime-grade/{zipcode}")
 async def get_crime_grade(zipcode: str):
     """Get crime grade for a zipcode."""
@@ -247,28 +331,53 @@ async def save_cache():
     return {"success": True}
 
 
+SAVED_SEARCHES_LIMIT = 20  # Last 20 searches
+
+# (inode, mtime) -> formatted "created" timestamp for the files listed last time
+_saved_search_times: dict[tuple[int, float], str] = {}
+
+
+def is_saved_search_name(filename: str) -> bool:
+    """Whether a file name is a saved search (search_*.json directly in DATA_DIR)."""
+    return (
+        filename.startswith("search_")
+        and filename.endswith(".json")
+        and "/" not in filename
+        and "\\" not in filename
+    )
+
+
 @app.get("/api/saved-searches")
 async def list_saved_searches():
-    """List all saved search files."""
-    files = sorted(DATA_DIR.glob("search_*.json"), reverse=True)
-    return [
-        {
-            "filename": f.name,
-            "created": datetime.fromtimestamp(f.stat().st_mtime).isoformat(),
-        }
-        for f in files[:20]  # Last 20 searches
-    ]
+    """List the most recent saved search files."""
+    global _saved_search_times
+    with os.scandir(DATA_DIR) as it:
+        entries = [e for e in it if is_saved_search_name(e.name) and e.is_file()]
+
+    # DirEntry caches its stat() result, so each file is stat'ed once; no full sort needed
+    latest = heapq.nlargest(SAVED_SEARCHES_LIMIT, entries, key=lambda e: e.stat().st_mtime)
+
+    times = {}
+    listing = []
+    for entry in latest:
+        key = (entry.inode(), entry.stat().st_mtime)
+        created = _saved_search_times.get(key) or datetime.fromtimestamp(key[1]).isoformat()
+        times[key] = created
+        listing.append({"filename": entry.name, "created": created})
+    _saved_search_times = times
+    return listing
 
 
 @app.get("/api/saved-searches/{filename}")
 async def get_saved_search(filename: str):
     """Get a specific saved search."""
+    # Only saved searches; the caches and snapshots that share DATA_DIR are not served
     filepath = DATA_DIR / filename
-    if not filepath.exists() or not filepath.is_file():
+    if not is_saved_search_name(filename) or not filepath.is_file():
         raise HTTPException(status_code=404, detail="Search not found")
 
-    with open(filepath) as f:
-        return json.load(f)
+    # The file already holds the JSON we'd send; stream it straight from disk (sendfile when available)
+    return FileResponse(filepath, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -1,19 +1,27 @@
 """
 Zillow API wrapper using curl_cffi for browser impersonation.
 """
-import json
+import asyncio
+import http.cookiejar
 import logging
 import os
 import re
+import tempfile
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Mapping
 from urllib.parse import quote, unquote
 
+import orjson
 import urllib3
-from curl_cffi.requests import Session
+from curl_cffi.requests import AsyncSession, RequestsError
+from curl_cffi.requests.exceptions import HTTPError
 from dotenv import load_dotenv
 
+from brightdata import BACKOFF_BASE, MAX_RETRIES, RateLimiter, retry_delay
+
 # Suppress SSL warnings for proxy
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -30,62 +38,277 @@ BRIGHTDATA_PASSWORD = os.environ.get("BRIGHTDATA_PASSWORD")
 USE_PROXY = os.environ.get("USE_ZILLOW_PROXY", "true").lower() == "true"
 
 
+@lru_cache(maxsize=1)
 def get_proxy_url() -> str | None:
-    """Build Bright Data proxy URL if credentials are configured."""
+    """Build Bright Data proxy URL if credentials are configured (built once; the settings are read at import)."""
     if not USE_PROXY or not BRIGHTDATA_USERNAME or not BRIGHTDATA_PASSWORD:
         return None
     encoded_password = quote(BRIGHTDATA_PASSWORD, safe='')
     return f"http://{BRIGHTDATA_USERNAME}:{encoded_password}@{BRIGHTDATA_HOST}:{BRIGHTDATA_PORT}"
 
+
+# Optional comma-separated proxy URLs to rotate page requests across (e.g. the
+# same Bright Data zone with different "-session-<id>" usernames, each pinned
+# to its own exit IP); the single proxy above is used when empty. Ignored, like
+# the proxy above, when USE_ZILLOW_PROXY is off
+PROXY_POOL = [
+    p.strip() for p in os.environ.get("BRIGHTDATA_PROXY_POOL", "").split(",") if p.strip()
+] if USE_PROXY else []
+
+# Session proxy settings, computed once rather than per session
+_PROXY_URL = get_proxy_url()
+_PROXIES = {"http": _PROXY_URL, "https": _PROXY_URL} if _PROXY_URL else None
+_VERIFY_SSL = not (_PROXY_URL or PROXY_POOL)  # Disable SSL verification when using proxy
+
 ZILLOW_SEARCH_URL = "https://www.zillow.com/async-create-search-page-state"
 COOKIES_FILE = Path(__file__).parent / "zillow_cookies.json"
+# Cookies Zillow sets on the first page visit; with one of them the warm-up visit is skipped
+_SESSION_COOKIE_NAMES = frozenset({"JSESSIONID", "zguid"})
+
+# searchQueryState as a query parameter, or JSON-embedded (URL-encoded) in the path
+_SQS_RE = re.compile(r'searchQueryState=([^&]+)')
+_SQS_EMBEDDED_RE = re.compile(r'searchQueryState%22%3A(%7B.+?%7D)(?:&|$)')
+
+# Home type filter keys Zillow accepts in filterState
+_VALID_PROPERTY_TYPES = frozenset({"sf", "tow", "mf", "con", "land", "apa", "manu", "apco"})
+
+# Result fields kept for the frontend's table, columns and export (static/js/app.js):
+# top-level fields, including the ones getNestedValue falls back to when the
+# hdpData.homeInfo value is missing (or daysOnZillow is negative), plus those
+# hdpData.homeInfo fields
+_RESULT_KEYS = (
+    "zpid", "detailUrl", "statusText", "price", "unformattedPrice",
+    "address", "addressStreet", "addressCity", "addressState", "addressZipcode",
+    "beds", "baths", "area", "latLong", "latitude", "longitude", "homeType",
+    "zestimate", "rentZestimate", "daysOnZillow", "yearBuilt",
+    "lotAreaValue", "taxAssessedValue",
+)
+_HOME_INFO_KEYS = (
+    "zpid", "price", "city", "state", "zipcode", "homeType", "livingArea",
+    "zestimate", "rentZestimate", "daysOnZillow", "yearBuilt",
+    "lotAreaValue", "lotAreaUnit", "taxAssessedValue",
+)
+
+# curl's CURLINFO_HTTP_VERSION codes, as reported by Response.http_version
+_HTTP_VERSIONS = {1: "1.0", 2: "1.1", 3: "2", 30: "3"}
+
+PAGE_CONCURRENCY = 8  # Result pages fetched at once after the first one
+# Concurrent transfers per session (curl_cffi defaults to 10); room for a few searches' pages at once
+SESSION_MAX_CLIENTS = 32
+PAGE_RATE_LIMIT = 4.0  # Result-page requests per second to Zillow on average
+PAGE_BURST = 8  # Page requests allowed back to back before the rate limit kicks in
+
+# Paces page requests across all searches; only sleeps once the burst is used up
+_page_limiter = RateLimiter(PAGE_RATE_LIMIT, burst=PAGE_BURST)
+
+
+class ProxyRotator:
+    """
+    Round-robin over proxies for page requests. A proxy that gets rate limited
+    or fails is benched for a cooldown and skipped while others are available;
+    None stands for the session's own proxy (or a direct connection).
+    """
+
+    def __init__(self, proxies: list[str | None]):
+        self.proxies = proxies
+        self._cooldown_until = dict.fromkeys(proxies, 0.0)  # Monotonic time each proxy is usable again
+        self._next = 0
+
+    def next_proxy(self) -> str | None:
+        """Next proxy not cooling down, or the one that is usable soonest if all are."""
+        now = time.monotonic()
+        count = len(self.proxies)
+        for i in range(count):
+            proxy = self.proxies[(self._next + i) % count]
+            if self._cooldown_until[proxy] <= now:
+                self._next = (self._next + i + 1) % count
+                return proxy
+        return min(self.proxies, key=self._cooldown_until.__getitem__)
+
+    def cooldown_remaining(self, proxy: str | None) -> float:
+        return max(0.0, self._cooldown_until[proxy] - time.monotonic())
+
+    def mark_failure(self, proxy: str | None, cooldown: float) -> None:
+        self._cooldown_until[proxy] = max(self._cooldown_until[proxy], time.monotonic() + cooldown)
+
+
+_proxy_rotator = ProxyRotator(PROXY_POOL or [None])
+
+# One impersonating async session reused across searches and pages, so TLS
+# sessions, keep-alive connections and the cookie jar carry over between
+# requests (created lazily on the server's event loop)
+_async_session: AsyncSession | None = None
+
 
+async def _throttle_page_request(proxy: str | None) -> None:
+    """Wait for a rate-limit token, then sit out the proxy's cooldown, if any."""
+    await _page_limiter.wait_async()
+    delay = _proxy_rotator.cooldown_remaining(proxy)
+    if delay > 0:
+        await asyncio.sleep(delay)
 
-def load_cookies() -> dict[str, str]:
-    """Load cookies from JSON file exported from browser."""
-    if not COOKIES_FILE.exists():
+
+def load_cookies() -> list[dict[str, Any]]:
+    """
+    Load cookies from JSON file exported from browser (or saved by save_cookies),
+    as {name, value, domain, path, secure, expirationDate} dicts. Expired
+    cookies are left out.
+    """
+    try:
+        mtime = COOKIES_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
         logger.warning(f"Cookies file not found: {COOKIES_FILE}")
-        return {}
+        return []
+
+    # Parsed once per file version; re-exporting the cookies file is picked up on the next call
+    now = time.time()
+    return [c for c in _read_cookies(mtime) if c["expirationDate"] is None or c["expirationDate"] > now]
+
+
+@lru_cache(maxsize=1)
+def _read_cookies(mtime: int) -> tuple[dict[str, Any], ...]:
+    try:
+        cookies_list = orjson.loads(COOKIES_FILE.read_bytes())
+
+        # Handle both formats: list of cookie objects or simple dict
+        if isinstance(cookies_list, dict):
+            cookies_list = [{"name": name, "value": value} for name, value in cookies_list.items()]
+
+        # List format as exported by extensions like "Cookie-Editor"
+        return tuple(
+            {
+                "name": c["name"],
+                "value": c["value"],
+                "domain": c.get("domain", ""),
+                "path": c.get("path", "/"),
+                "secure": c.get("secure", False),
+                "expirationDate": c.get("expirationDate"),
+            }
+            for c in cookies_list if c.get("name")
+        )
+    except (OSError, orjson.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        # A broken file must not fail every search; the warm-up visit gets fresh cookies
+        logger.error(f"Could not read cookies from {COOKIES_FILE}, starting without them: {e}")
+        return ()
+
+
+def _set_cookie(session: AsyncSession, cookie: dict[str, Any]) -> None:
+    """Add a load_cookies() entry to the session's jar, keeping its domain, path and expiry."""
+    domain = cookie["domain"]
+    expires = cookie["expirationDate"]
+    session.cookies.jar.set_cookie(http.cookiejar.Cookie(
+        version=0, name=cookie["name"], value=cookie["value"],
+        port=None, port_specified=False,
+        domain=domain, domain_specified=bool(domain), domain_initial_dot=domain.startswith("."),
+        path=cookie["path"], path_specified=True,
+        secure=cookie["secure"], expires=int(expires) if expires is not None else None,
+        discard=expires is None, comment=None, comment_url=None, rest={},
+    ))
+
+
+def save_cookies(session: AsyncSession) -> None:
+    """
+    Write the session's cookie jar to COOKIES_FILE (in the browser-export list
+    format, with domain, path and expiry) so the next run can skip the warm-up visit.
+    """
+    now = time.time()
+    cookies = [
+        {
+            "name": c.name,
+            "value": c.value,
+            "domain": c.domain,
+            "path": c.path,
+            "secure": c.secure,
+            "expirationDate": c.expires,
+        }
+        for c in session.cookies.jar if not c.is_expired(now)
+    ]
+    if not cookies:
+        return
+    tmp_path = None
+    try:
+        # A temp file per writer: several server workers may save at the same moment
+        with tempfile.NamedTemporaryFile(
+            dir=COOKIES_FILE.parent, prefix=f"{COOKIES_FILE.stem}.", suffix=".tmp", delete=False
+        ) as tmp_file:
+            tmp_path = Path(tmp_file.name)
+            tmp_file.write(orjson.dumps(cookies, option=orjson.OPT_INDENT_2))
+        tmp_path.replace(COOKIES_FILE)
+    except OSError as e:
+        logger.warning(f"Could not save cookies to {COOKIES_FILE}: {e}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _has_session_cookies(session: AsyncSession) -> bool:
+    """Whether the session already carries a Zillow visitor session."""
+    return any(c.name in _SESSION_COOKIE_NAMES for c in session.cookies.jar)
+
+
+def _new_async_session() -> AsyncSession:
+    """Create an impersonating async session with proxy settings and exported cookies."""
+    if _PROXIES:
+        logger.info("Using Bright Data proxy for Zillow requests")
+    else:
+        logger.info("Making direct Zillow requests (no proxy)")
+    session = AsyncSession(
+        impersonate="chrome",
+        proxies=_PROXIES,
+        verify=_VERIFY_SSL,
+        max_clients=SESSION_MAX_CLIENTS,
+    )
+    for cookie in load_cookies():
+        _set_cookie(session, cookie)
+    return session
+
 
-    with open(COOKIES_FILE) as f:
-        cookies_list = json.load(f)
+def _get_async_session() -> AsyncSession:
+    """Return the shared async session, creating it on first use."""
+    global _async_session
+    if _async_session is None:
+        _async_session = _new_async_session()
+    return _async_session
 
-    # Handle both formats: list of cookie objects or simple dict
-    if isinstance(cookies_list, dict):
-        return cookies_list
 
-    # Convert list format (from extensions like "Cookie-Editor") to dict
-    return {c["name"]: c["value"] for c in cookies_list if c.get("name")}
+async def close_async_session() -> None:
+    """Save the shared async session's cookies and close it (call on app shutdown)."""
+    global _async_session
+    if _async_session is not None:
+        save_cookies(_async_session)
+        await _async_session.close()
+        _async_session = None
 
 
-def parse_bounds_from_url(zillow_url: str) -> dict[str, Any] | None:
+@lru_cache(maxsize=256)
+def parse_bounds_from_url(zillow_url: str) -> Mapping[str, Any] | None:
     """
     Extract map bounds from a Zillow search URL.
+    Results are memoized per URL and returned read-only (copy with dict() to modify).
 
     Args:
         zillow_url: A Zillow search URL containing searchQueryState
 
     Returns:
-        Dictionary with ne_lat, ne_long, sw_lat, sw_long, zoom_value, custom_region_id
+        Mapping with ne_lat, ne_long, sw_lat, sw_long, zoom_value, custom_region_id
         or None if parsing fails
     """
     try:
         # Look for searchQueryState in the URL
-        match = re.search(r'searchQueryState=([^&]+)', zillow_url)
+        match = _SQS_RE.search(zillow_url)
         if not match:
             # Try to find it in a different format (embedded in path)
-            match = re.search(r'searchQueryState%22%3A(%7B.+?%7D)(?:&|$)', zillow_url)
+            match = _SQS_EMBEDDED_RE.search(zillow_url)
             if not match:
                 logger.error("Could not find searchQueryState in URL")
                 return None
 
         encoded_state = match.group(1)
         decoded_state = unquote(encoded_state)
-        query_state = json.loads(decoded_state)
+        query_state = orjson.loads(decoded_state)
 
         map_bounds = query_state.get("mapBounds", {})
 
-        return {
+        return MappingProxyType({
             "ne_lat": map_bounds.get("north"),
             "ne_long": map_bounds.get("east"),
             "sw_lat": map_bounds.get("south"),
@@ -95,29 +318,37 @@ def parse_bounds_from_url(zillow_url: str) -> dict[str, Any] | None:
             # "region_selection": query_state.get("regionSelection"),
             # "users_search_term": query_state.get("usersSearchTerm"),
             "original_url": zillow_url,
-        }
-    except (json.JSONDecodeError, KeyError) as e:
+        })
+    except (orjson.JSONDecodeError, KeyError) as e:
         logger.error(f"Failed to parse Zillow URL: {e}")
         return None
 
 
-def search_properties(
-    bounds: dict[str, float],
-    filters: dict[str, Any],
-    search_type: str = "sale",
-    pagination: int = 1,
-) -> dict[str, Any]:
-    """
-    Search Zillow properties using curl_cffi with browser impersonation.
+def _project_result(result: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the fields of a list/map result that the app reads (photos, badges etc. are dropped)."""
+    projected = {k: result[k] for k in _RESULT_KEYS if k in result}
+    home_info = (result.get("hdpData") or {}).get("homeInfo")
+    if home_info:
+        projected["hdpData"] = {"homeInfo": {k: home_info[k] for k in _HOME_INFO_KEYS if k in home_info}}
+    return projected
 
-    Args:
-        bounds: Dictionary with ne_lat, ne_long, sw_lat, sw_long, zoom_value
-        filters: Dictionary with beds, baths, price, year_built, property_types
-        search_type: "sale" or "rent"
 
-    Returns:
-        Dictionary with mapResults and listResults
+def _filters_key(filters: dict[str, Any]) -> tuple:
+    """Hashable, order-independent form of a filters dict (nested property_types included)."""
+    return tuple(sorted(
+        (k, tuple(sorted(v.items())) if isinstance(v, dict) else v) for k, v in filters.items()
+    ))
+
+
+@lru_cache(maxsize=128)
+def _build_filter_state(search_type: str, filters_key: tuple) -> dict[str, Any]:
+    """
+    Zillow filterState for a search type and _filters_key(filters). Cached, so
+    repeated searches with the same filters skip the rebuild; callers must
+    treat the result as read-only.
     """
+    filters = dict(filters_key)
+
     # Build filter state based on search type
     if search_type == "rent":
         filter_state = {
@@ -186,11 +417,16 @@ def search_properties(
         filter_state["sqft"] = sqft
 
     # Add property type filters
-    property_types = filters.get("property_types", {})
+    property_types = dict(filters.get("property_types", ()))
     for prop_type, include in property_types.items():
-        if prop_type in ["sf", "tow", "mf", "con", "land", "apa", "manu", "apco"]:
+        if prop_type in _VALID_PROPERTY_TYPES:
             filter_state[prop_type] = {"value": include}
 
+    return filter_state
+
+
+def _build_input_data(bounds: Mapping[str, Any], filters: dict[str, Any], search_type: str) -> dict[str, Any]:
+    """Request payload for the first result page of a search."""
     # Build request payload
     input_data = {
         "searchQueryState": {
@@ -202,9 +438,9 @@ def search_properties(
                 "south": bounds["sw_lat"],
                 "west": bounds["sw_long"],
             },
-            "filterState": filter_state,
+            "filterState": _build_filter_state(search_type, _filters_key(filters)),
             "mapZoom": bounds.get("zoom_value", 12),
-            "pagination": {"currentPage": pagination},
+            "pagination": {"currentPage": 1},
         },
         "wants": {
             "cat1": ["listResults", "mapResults"],
@@ -214,93 +450,206 @@ def search_properties(
         "isDebugRequest": False,
     }
 
-    # print(json.dumps(input_data, indent=2))
+    # print(orjson.dumps(input_data, option=orjson.OPT_INDENT_2).decode())
 
     # Add custom region ID if provided
     if bounds.get("custom_region_id"):
         input_data["searchQueryState"]["customRegionId"] = bounds["custom_region_id"]
 
-    # Use a session to maintain cookies
-    proxy_url = get_proxy_url()
-    proxies = {"http": proxy_url, "https": proxy_url} if proxy_url else None
-    verify_ssl = not proxy_url  # Disable SSL verification when using proxy
+    return input_data
 
-    if proxy_url:
-        logger.info("Using Bright Data proxy for Zillow requests")
-    else:
-        logger.info("Making direct Zillow requests (no proxy)")
 
-    with Session(impersonate="chrome") as session:
-        # First, visit the original Zillow page to get cookies
-        original_url = bounds.get("original_url", "https://www.zillow.com/homes/")
+def search_properties(
+    bounds: dict[str, float],
+    filters: dict[str, Any],
+    search_type: str = "sale",
+) -> dict[str, Any]:
+    """
+    Search Zillow properties using curl_cffi with browser impersonation.
+    For synchronous callers (uses asyncio.run with a session of its own).
+
+    Args:
+        bounds: Dictionary with ne_lat, ne_long, sw_lat, sw_long, zoom_value
+        filters: Dictionary with beds, baths, price, year_built, property_types
+        search_type: "sale" or "rent"
+
+    Returns:
+        Dictionary with mapResults and listResults
+    """
+    async def run() -> dict[str, Any]:
+        async with _new_async_session() as session:
+            try:
+                return await search_properties_async(bounds, filters, search_type, session)
+            finally:
+                save_cookies(session)
+
+    return asyncio.run(run())
+
+
+async def iter_search_pages(
+    bounds: dict[str, float],
+    filters: dict[str, Any],
+    search_type: str = "sale",
+    session: AsyncSession | None = None,
+) -> AsyncIterator[tuple[int, list[dict], list[dict]]]:
+    """
+    Fetch a search's result pages with curl_cffi browser impersonation and
+    yield (page, listResults, mapResults) for each one as it arrives. The
+    first page reveals the page count and comes first; the remaining pages
+    are fetched concurrently (at most PAGE_CONCURRENCY at a time) and yielded
+    in completion order. A failed page raises and cancels the rest.
+
+    Args:
+        bounds: Dictionary with ne_lat, ne_long, sw_lat, sw_long, zoom_value
+        filters: Dictionary with beds, baths, price, year_built, property_types
+        search_type: "sale" or "rent"
+        session: Session to use (defaults to the shared one)
+    """
+    input_data = _build_input_data(bounds, filters, search_type)
+
+    # Use the shared session to maintain cookies and connections
+    session = session or _get_async_session()
+
+    # First, visit the original Zillow page to get cookies (unless we already have a session)
+    original_url = bounds.get("original_url", "https://www.zillow.com/homes/")
 
+    async def warm_up() -> None:
         try:
             # Initial page visit to get cookies
-            session.get(
-                original_url,
-                proxies=proxies,
-                verify=verify_ssl,
-                timeout=30,
-            )
+            await session.get(original_url, timeout=30)
         except Exception as e:
             logger.warning(f"Initial page visit failed: {e}")
 
-        # Now make the API request with the session cookies
-        headers = {
-            "Accept": "*/*",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Content-Type": "application/json",
-            "Origin": "https://www.zillow.com",
-            "Referer": original_url,
-        }
+    warmed_up = not _has_session_cookies(session)
+    if warmed_up:
+        await warm_up()
+
+    # Now make the API request with the session cookies
+    headers = {
+        "Accept": "*/*",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Content-Type": "application/json",
+        "Origin": "https://www.zillow.com",
+        "Referer": original_url,
+    }
 
-        page = 1
-        last_page = float('inf')
-        search_results = {
-            'listResults': [],
-            'mapResults': [],
-        }
-        while page < last_page:
-            print(f'Searching for page {page} out of {last_page}')
-
-            input_data["searchQueryState"]["pagination"] = {"currentPage": page}
-
-            response = session.put(
-                url=ZILLOW_SEARCH_URL,
-                json=input_data,
-                headers=headers,
-                proxies=proxies,
-                verify=verify_ssl,
-                timeout=60,
-            )
-            
+    # Serialize the payload once; pages only differ in currentPage, which is
+    # spliced into the bytes (immutable, so concurrent requests can share them)
+    payload_head, _, payload_tail = orjson.dumps(input_data).partition(b'"currentPage":1}')
+
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def fetch_page(page: int) -> tuple[int, list[dict], list[dict]]:
+        payload = b'%b"currentPage":%d}%b' % (payload_head, page, payload_tail)
+        async with semaphore:
+            logger.debug(f"Searching for page {page}")
+            delay = BACKOFF_BASE
+            for attempt in range(MAX_RETRIES + 1):
+                # Failed attempts are retried through a different proxy when the pool has one
+                proxy = _proxy_rotator.next_proxy()
+                await _throttle_page_request(proxy)
+                try:
+                    response = await session.put(
+                        url=ZILLOW_SEARCH_URL,
+                        data=payload,
+                        headers=headers,
+                        timeout=60,
+                        **({"proxy": proxy} if proxy else {}),
+                    )
+                except RequestsError as e:
+                    if attempt == MAX_RETRIES:
+                        raise
+                    delay = retry_delay(delay)
+                    _proxy_rotator.mark_failure(proxy, delay)
+                    logger.warning(f"Page {page} request failed ({e}), retrying")
+                    continue
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+                # Bench the proxy, longer on each failure in a row (or as long as Retry-After asks)
+                delay = retry_delay(delay, response)
+                _proxy_rotator.mark_failure(proxy, delay)
+                if attempt == MAX_RETRIES:
+                    break
+                logger.warning(f"Page {page} got HTTP {response.status_code}, retrying")
             response.raise_for_status()
-            data = response.json()
-            current_search_results = data.get("cat1", {}).get("searchResults", {})
-            search_results['listResults'].extend(current_search_results.get('listResults', []))
-            search_results['mapResults'].extend(current_search_results.get('mapResults', []))
-            
-            print("Last page=", data['cat1']['searchList']['totalPages'])
-            if last_page == float('inf'):
-                last_page = data['cat1']['searchList']['totalPages']
-            
-            time.sleep(0.5)
-
-            page += 1
-
-    return search_results
+        if page == 1:
+            # Concurrent pages share one connection only if this is HTTP/2 (or 3)
+            logger.info(f"Zillow search API answered over HTTP/{_HTTP_VERSIONS.get(response.http_version, '?')}")
+        # Keep just the page count and the two result lists; the rest of the
+        # page's object graph is freed here instead of living until the merge
+        cat1 = orjson.loads(response.content).get("cat1", {})
+        current_search_results = cat1.get("searchResults", {})
+        return (
+            cat1.get("searchList", {}).get("totalPages", 1),
+            [_project_result(r) for r in current_search_results.get("listResults", [])],
+            [_project_result(r) for r in current_search_results.get("mapResults", [])],
+        )
+
+    # The first page tells us how many pages there are
+    try:
+        last_page, list_results, map_results = await fetch_page(1)
+    except HTTPError as e:
+        # Saved cookies may have gone stale: drop them, get fresh ones and try once more
+        if warmed_up or e.response is None or e.response.status_code not in (401, 403):
+            raise
+        logger.warning(f"Zillow rejected the session cookies (HTTP {e.response.status_code}), refreshing them")
+        session.cookies.clear()
+        await warm_up()
+        last_page, list_results, map_results = await fetch_page(1)
+    logger.info(f"Search has {last_page} result pages")
+    yield 1, list_results, map_results
+
+    # Pages 2..last_page are independent of each other
+    tasks = {asyncio.ensure_future(fetch_page(page)): page for page in range(2, last_page + 1)}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Check every finished task (which marks its exception as retrieved) before raising the first
+            errors = [task.exception() for task in done if task.exception() is not None]
+            if errors:
+                raise errors[0]
+            for task in done:
+                _, list_results, map_results = task.result()
+                yield tasks[task], list_results, map_results
+    finally:
+        # Stop fetching if a page failed or the caller stopped iterating
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
 
-# Async wrapper for FastAPI
 async def search_properties_async(
     bounds: dict[str, float],
     filters: dict[str, Any],
     search_type: str = "sale",
+    session: AsyncSession | None = None,
 ) -> dict[str, Any]:
-    """Async wrapper that runs the sync search in a thread pool."""
-    import asyncio
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None,
-        lambda: search_properties(bounds, filters, search_type)
-    )
+    """
+    Search Zillow properties using curl_cffi with browser impersonation
+    (see iter_search_pages) and merge the pages in page order.
+
+    Args:
+        bounds: Dictionary with ne_lat, ne_long, sw_lat, sw_long, zoom_value
+        filters: Dictionary with beds, baths, price, year_built, property_types
+        search_type: "sale" or "rent"
+        session: Session to use (defaults to the shared one)
+
+    Returns:
+        Dictionary with mapResults and listResults
+    """
+    pages = {}
+    async for page, list_results, map_results in iter_search_pages(bounds, filters, search_type, session):
+        pages[page] = (list_results, map_results)
+
+    search_results = {
+        'listResults': [],
+        'mapResults': [],
+    }
+    for page in sorted(pages):
+        list_results, map_results = pages[page]
+        search_results['listResults'].extend(list_results)
+        search_results['mapResults'].extend(map_results)
+
+    return search_results
+